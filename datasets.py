@@ -24,7 +24,6 @@ It can be found at: http://www.itl.nist.gov/div898/strd/nls/data/thurber.shtml
 """
 
 import numpy as np
-import sympy as sp
 
 __author__  = "Basil L. Contovounesios"
 __email__   = "contovob@tcd.ie"
@@ -48,9 +47,11 @@ class Dataset:
         expr : string
             Representation of dataset's model in a format understood by
             sympy.sympify().
-        symbols : tuple or list
-            SymPy Symbols found in `expr`. The first one should be the predictor
-            variable and the rest are interpreted as model parameters.
+        symbols : string
+            Specification of the symbols found in `expr`, in a format
+            understood by sympy.symbols(). The first one should be the
+            predictor variable and the rest are interpreted as model
+            parameters.
         xvals : ndarray
             Observed or generated values for predictor variable.
         yvals : ndarray
@@ -67,16 +68,59 @@ class Dataset:
 
         self.xvals, self.yvals, self.cvals = xvals, yvals, cvals
 
+        # Symbolic machinery is compiled on first use; see _compile()
+        self._numexpr = None
+        # Reusable output buffers, keyed by shape; see _jacbuf()
+        self._bufs = {}
+
+    def _compile(self):
+        """Compile the symbolic model and its derivatives on first use.
+
+        Postponed from the constructor, and never triggered by datasets whose
+        evaluation functions are all hand-written, so that merely importing
+        this module does not pay for importing SymPy.
+        """
+        if self._numexpr is not None:
+            return
+        import sympy as sp
+
+        symbols = sp.symbols(self.symbols)
         # Predictor variable and parameters
-        self._x, self._b = symbols[0], symbols[1:]
+        self._x, self._b = symbols[0], tuple(symbols[1:])
 
         # SymPy expression
-        self._symexpr = sp.sympify(expr)
-        # NumPy expression
-        self._numexpr = sp.lambdify((self._x,) + self._b, self._symexpr, "numpy")
+        self._symexpr = sp.sympify(self.expr)
+        # NumPy expression, with common subexpressions evaluated only once
+        self._numexpr = sp.lambdify((self._x,) + self._b, self._symexpr,
+                                    "numpy", cse=True)
         # Partial derivatives
         self._pderivs = [self._symexpr.diff(b) for b in self._b]
 
+        # Integer powers of the predictor variable appearing in the model or
+        # its derivatives are precomputed over the x-values once, and passed
+        # to the residual/Jacobian functions as extra arguments, rather than
+        # being recomputed on every evaluation
+        exprs = [self._symexpr] + self._pderivs
+        pows  = sorted({p for e in exprs for p in e.atoms(sp.Pow)
+                        if p.base == self._x and p.exp.is_Integer and p.exp > 1},
+                       key = lambda p: p.exp)
+        dums  = [sp.Dummy(f"x{p.exp}") for p in pows]
+        subs  = dict(zip(pows, dums))
+        self._xpows = [self.xvals ** int(p.exp) for p in pows]
+
+        # Single precompiled NumPy expression returning all partial
+        # derivatives, i.e. Jacobian columns, at once, with subexpressions
+        # shared between columns evaluated only once
+        self._jacfn = sp.lambdify((self._x, *dums) + self._b,
+                                  [pd.subs(subs) for pd in self._pderivs],
+                                  "numpy", cse=True)
+        # Fused residual + Jacobian evaluation, so subexpressions shared
+        # between the model and its derivatives, such as Misra1a's
+        # exp(-b2 * x), are computed only once per call
+        self._evalfn = sp.lambdify((self._x, *dums) + self._b,
+                                   [e.subs(subs) for e in exprs],
+                                   "numpy", cse=True)
+
     def __repr__(self):
         """Return Dataset description in the form <Dataset NAME at ADDRESS>."""
         return f"<Dataset {self.name} at {id(self):x}>"
@@ -101,33 +145,41 @@ class Dataset:
         y : ndarray
             Corresponding values for the response variable.
         """
+        self._compile()
         if x is None: x = self.xvals
         if b is None: b = self.cvals
         return self._numexpr(x, *b)
 
-    def residuals(self, b):
+    def residuals(self, b, out=None):
         """Evaluate the residuals f(x, b) - y with the given parameters.
 
         Parameters
         ----------
         b : tuple, list or ndarray
             Values for the model parameters.
+        out : ndarray
+            Buffer in which to store the result, saving an allocation.
+            Defaults to allocating a new array.
 
         Return
         ------
         out : ndarray
             Residual vector for the given model parameters.
         """
+        self._compile()
         x, y = self.xvals, self.yvals
-        return self._numexpr(x, *b) - y
+        return np.subtract(self._numexpr(x, *b), y, out=out)
 
-    def jacobian(self, b):
+    def jacobian(self, b, out=None):
         """Evaluate the model's Jacobian matrix with the given parameters.
 
         Parameters
         ----------
         b : tuple, list or ndarray
             Values for the model parameters.
+        out : ndarray
+            Buffer in which to store the result, saving an allocation.
+            Defaults to allocating a new array.
 
         Return
         ------
@@ -135,17 +187,182 @@ class Dataset:
             Evaluation of the model's Jacobian matrix in column-major order wrt
             the model parameters.
         """
-        # Substitute parameters in partial derivatives
-        subs = [pd.subs(zip(self._b, b)) for pd in self._pderivs]
-        # Evaluate substituted partial derivatives for all x-values
-        vals = [sp.lambdify(self._x, sub, "numpy")(self.xvals) for sub in subs]
+        self._compile()
+        # Evaluate all precompiled partial derivatives for all x-values
+        vals = self._jacfn(self.xvals, *self._xpows, *b)
         # Arrange values in column-major order
-        return np.column_stack(vals)
+        if out is None:
+            return np.column_stack(vals)
+        for j, val in enumerate(vals):
+            out[:, j] = val
+        return out
+
+    def eval(self, b):
+        """Evaluate the residuals and Jacobian matrix in a single pass.
+
+        Equivalent to, but cheaper than, calling residuals() and jacobian()
+        separately, as subexpressions shared between the model and its partial
+        derivatives are evaluated only once.
+
+        Parameters
+        ----------
+        b : tuple, list or ndarray
+            Values for the model parameters. Can also be a 2D array of
+            multiple parameter vectors, in which case the residuals and
+            Jacobians are evaluated for the whole batch at once.
+
+        Return
+        ------
+        res : ndarray
+            Residual vector(s) for the given model parameters.
+        jac : ndarray
+            Evaluation of the model's Jacobian matrix (matrices) in
+            column-major order wrt the model parameters.
+        """
+        self._compile()
+        b = np.asarray(b)
+        if b.ndim > 1:
+            # Broadcast each parameter column against the x-values
+            vals = self._evalfn(self.xvals, *self._xpows,
+                                *(bi[:, None] for bi in b.T))
+            return vals[0] - self.yvals, np.stack(vals[1:], axis=-1)
+        vals = self._evalfn(self.xvals, *self._xpows, *b)
+        return vals[0] - self.yvals, np.column_stack(vals[1:])
+
+    def _jacbuf(self, shape):
+        """Return a reusable output buffer of the given shape.
+
+        Spares hot evaluation paths an allocation per call. Callers must
+        consume the buffer before the next call with the same shape.
+        """
+        buf = self._bufs.get(shape)
+        if buf is None:
+            buf = self._bufs[shape] = np.empty(shape)
+        return buf
+
+    @staticmethod
+    def _bcast(b):
+        """Return the parameters in `b` ready for broadcasting against x.
+
+        Parameter vectors in a 2D batch gain a trailing axis, so that
+        arithmetic with the 1D x-values yields one row per vector.
+        """
+        b = np.asarray(b)
+        return (bi[:, None] for bi in b.T) if b.ndim > 1 else b
+
+class _Misra1a(Dataset):
+
+    """Misra1a Dataset with hand-tuned evaluation functions."""
+
+    def model(self, x=None, b=None):
+        """Evaluate the model with a hand-written NumPy expression.
+
+        See Dataset.model() for the parameters and return values.
+        """
+        if x is None: x = self.xvals
+        if b is None: b = self.cvals
+        b1, b2 = b
+        return b1 * (1 - np.exp(-b2 * x))
+
+    def eval(self, b):
+        """Evaluate residuals and Jacobian in a single hand-written pass.
+
+        See Dataset.eval() for the parameters and return values. The
+        exponential, by far the dominant cost of this model, is computed
+        exactly once, and the whole chain of elementwise operations runs in
+        place over reused buffers, allocating a single temporary.
+        """
+        b1, b2 = self._bcast(b)
+        x = self.xvals
+        e = -b2 * x                     # The only fresh allocation
+        np.exp(e, out = e)              # Shared between model and derivatives
+        jac = self._jacbuf(e.shape + (2,))
+        f = np.subtract(1, e, out = jac[..., 0])
+        np.multiply(x, e, out = jac[..., 1])
+        np.multiply(jac[..., 1], b1, out = jac[..., 1])
+        res = self._jacbuf(e.shape)
+        np.multiply(b1, f, out = res)
+        np.subtract(res, self.yvals, out = res)
+        return res, jac
+
+class _Thurber(Dataset):
+
+    """Thurber Dataset with hand-tuned evaluation functions."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Both cubics are linear in their parameters for fixed x, so each
+        # evaluates as a single product against this design matrix of
+        # precomputed predictor powers (1, x, x**2, x**3)
+        x = self.xvals
+        self._design = np.column_stack((np.ones_like(x), x, x * x, x * x * x))
+
+    def model(self, x=None, b=None):
+        """Evaluate the model with a hand-written NumPy expression.
+
+        See Dataset.model() for the parameters and return values.
+        """
+        if x is None: x = self.xvals
+        if b is None: b = self.cvals
+        b1, b2, b3, b4, b5, b6, b7 = b
+        return (b1 + x * (b2 + x * (b3 + x * b4))) / \
+               ( 1 + x * (b5 + x * (b6 + x * b7)))
+
+    def _cubics(self, b):
+        """Evaluate the model's numerator and denominator cubics at `b`."""
+        P = self._design
+        return b[..., :4] @ P.T, 1 + b[..., 4:] @ P[:, 1:].T
+
+    def residuals(self, b, out=None):
+        """Evaluate the residuals in a single hand-written pass.
+
+        See Dataset.residuals() for the parameters and return values.
+        """
+        num, den = self._cubics(np.asarray(b))
+        return np.subtract(num / den, self.yvals, out=out)
+
+    def jacobian(self, b, out=None):
+        """Evaluate the Jacobian matrix in a single hand-written pass.
+
+        See Dataset.jacobian() for the parameters and return values.
+        """
+        P        = self._design
+        num, den = self._cubics(np.asarray(b))
+        inv = 1 / den                   # d(num)/db . 1/den for b1, ..., b4
+        g   = num * inv * inv           # num / den**2 for b5, b6, b7
+        cols = [P[:, j] * inv for j in range(4)]
+        cols += [-P[:, j] * g for j in range(1, 4)]
+        if out is None:
+            return np.stack(cols, axis = -1)
+        for j, col in enumerate(cols):
+            out[..., j] = col
+        return out
+
+    def eval(self, b):
+        """Evaluate residuals and Jacobian in a single hand-written pass.
+
+        See Dataset.eval() for the parameters and return values. The cubics
+        and reciprocal shared between the residuals and every Jacobian
+        column are evaluated exactly once, and the Jacobian is assembled in
+        a reused buffer.
+        """
+        P        = self._design
+        num, den = self._cubics(np.asarray(b))
+        inv = 1 / den
+        fx  = num * inv                 # Model values
+        g   = fx * inv                  # num / den**2 for b5, b6, b7
+        np.negative(g, out = g)
+        jac = self._jacbuf(den.shape + (7,))
+        for j in range(4):
+            np.multiply(P[:, j], inv, out = jac[..., j])
+        for j in range(1, 4):
+            np.multiply(P[:, j], g, out = jac[..., j + 3])
+        return fx - self.yvals, jac
 
-misra1a = Dataset(
+misra1a = _Misra1a(
        name = "Misra1a",
        expr = "b1 * (1 - exp(-b2 * x))",
-    symbols = sp.symbols("x b1:3"),
+    symbols = "x b1:3",
       xvals = np.array(( 77.6, 114.9, 141.1, 190.8, 239.9, 289.0, 332.8,
                         378.4, 434.8, 477.3, 536.8, 593.1, 689.1, 760.0)),
       yvals = np.array((10.07, 14.73, 17.94, 23.93, 29.61, 35.18, 40.02,
@@ -154,11 +371,13 @@ misra1a = Dataset(
      starts = np.array(((500, 0.0001), (250, 0.0005)))
 )
 
-thurber = Dataset(
+thurber = _Thurber(
        name = "Thurber",
-       expr = "(b1 + (b2 * x) + (b3 * (x ** 2)) + (b4 * (x ** 3))) /" \
-              "( 1 + (b5 * x) + (b6 * (x ** 2)) + (b7 * (x ** 3)))",
-    symbols = sp.symbols("x b1:8"),
+       # Cubics in Horner form: fewer multiplications and no explicit
+       # x**2, x**3 evaluations in the generated NumPy code
+       expr = "(b1 + x * (b2 + x * (b3 + x * b4))) /" \
+              "( 1 + x * (b5 + x * (b6 + x * b7)))",
+    symbols = "x b1:8",
       xvals = np.array((
                 -3.067, -2.981, -2.921, -2.912, -2.840, -2.797, -2.702, -2.699,
                 -2.633, -2.481, -2.363, -2.322, -1.501, -1.460, -1.274, -1.212,
@@ -15,22 +15,35 @@ __email__   = "contovob@tcd.ie"
 __version__ = "2023.01.27"
 __license__ = "BSD3"
 
+def _solve2(A, g):
+    """Solve the (stacked) symmetric 2x2 system(s) A . dx = g analytically.
+
+    For matrices this small the fixed dispatch cost of a LAPACK call
+    outweighs the half dozen flops of the closed-form solution.
+    """
+    a, b, d = A[..., 0, 0], A[..., 0, 1], A[..., 1, 1]
+    g0, g1  = g[..., 0], g[..., 1]
+    det     = a * d - b * b
+    return np.stack(((d * g0 - b * g1) / det,
+                     (a * g1 - b * g0) / det), axis = -1)
+
 def solve(sys, x0, tol=1e-10, maxits=256):
     """Gauss-Newton algorithm for solving nonlinear least squares problems.
 
     Parameters
     ----------
     sys : Dataset
-        Class providing residuals() and jacobian() functions. The former should
-        evaluate the residuals of a nonlinear system for a given set of
-        parameters. The latter should evaluate the Jacobian matrix of said
-        system for the same parameters.
+        Class providing an eval() function, which should evaluate both the
+        residuals of a nonlinear system and its Jacobian matrix for a given
+        set of parameters.
     x0 : tuple, list or ndarray
-        Initial guesses or starting estimates for the system.
+        Initial guesses or starting estimates for the system. Can also be a
+        2D array of multiple starting estimates, in which case all of them
+        are refined in a single batched run.
     tol : float
-        Tolerance threshold. The problem is considered solved when this value
-        becomes smaller than the magnitude of the correction vector.
-        Defaults to 1e-10.
+        Tolerance threshold. The problem is considered solved when the
+        Euclidean norm of the correction vector becomes smaller than this
+        value. Defaults to 1e-10.
     maxits : int
         Maximum number of iterations of the algorithm to perform.
         Defaults to 256.
@@ -38,26 +51,46 @@ def solve(sys, x0, tol=1e-10, maxits=256):
     Return
     ------
     sol : ndarray
-        Resultant values.
-    its : int
-        Number of iterations performed.
+        Resultant values, of the same shape as `x0`.
+    its : int or ndarray
+        Number of iterations performed, per starting estimate when batched.
 
     Note
     ----
-    Uses numpy.linalg.pinv() in place of similar functions from scipy, both
-    because it was found to be faster and to eliminate the extra dependency.
+    Solves the normal equations with numpy.linalg.solve() in place of similar
+    functions from scipy, both because it was found to be faster and to
+    eliminate the extra dependency.
     """
-    dx = np.ones(len(x0))   # Correction vector
-    xn = np.array(x0)       # Approximation of solution
+    x0 = np.asarray(x0, dtype=float)
+    batched = x0.ndim > 1
+
+    xn   = np.atleast_2d(x0).copy()     # Approximations of solution
+    its  = np.full(len(xn), maxits)     # Iterations until convergence
+    tol2 = tol * tol                    # Compare squared norms to skip sqrt
+    sq   = np.full(len(xn), np.inf)     # Squared norms of corrections
 
     i = 0
-    while (i < maxits) and (dx[dx > tol].size > 0):
-        # correction = pinv(jacobian) . residual vector
-        dx  = np.dot(np.linalg.pinv(sys.jacobian(xn)), -sys.residuals(xn))
+    while (i < maxits) and np.any(sq > tol2):
+        res, jac = sys.eval(xn)
+        # Negate the residuals in place rather than allocating a copy
+        np.negative(res, out=res)
+        # Normal equations: (J^T J) dx = -J^T r.  np.linalg.solve() accepts
+        # stacked matrices, so every start is solved in one call; 2x2
+        # systems are solved analytically instead.
+        jt  = np.swapaxes(jac, -1, -2)
+        A   = jt @ jac
+        g   = np.squeeze(jt @ res[..., None], -1)
+        if A.shape[-1] == 2:
+            dx = _solve2(A, g)
+        else:
+            dx = np.linalg.solve(A, g[..., None])[..., 0]
         xn += dx            # x_{n + 1} = x_n + dx_n
         i  += 1
+        # Record when each estimate first converges
+        sq = np.einsum("...i,...i->...", dx, dx)
+        its[(sq <= tol2) & (its == maxits)] = i
 
-    return xn, i
+    return (xn, its) if batched else (xn[0], its[0])
 
 def main():
     """Solve the Misra1a and Thurber problems from the datasets module."""
@@ -66,11 +99,11 @@ def main():
     np.set_printoptions(linewidth = 256)
 
     for ds in misra1a, thurber:
-        for i, x0 in enumerate(ds.starts):
-            sol, its = solve(ds, x0)
-            cv = ds.cvals
+        sols, its = solve(ds, ds.starts)
+        cv = ds.cvals
+        for i, (sol, it) in enumerate(zip(sols, its)):
             print(f"{ds}, start {i + 1}:")
-            print(f"  Iterations : {its}")
+            print(f"  Iterations : {it}")
             print(f"  Calculated : {sol}")
             print(f"  Certified  : {cv}")
             print(f"  Difference : {np.abs(sol - cv)}")